@@ -1,46 +1,99 @@
 """Shared Snowflake utility functions."""
 
 import os
-from typing import Iterable, Optional
+import re
+from typing import Generator
 
 from snowflake.connector import SnowflakeConnection
 from snowflake.connector.cursor import SnowflakeCursor
 
 from ds_platform_utils.sql_utils import add_select_dev_query_tags_to_sql
 
+# resolved once at import, since queries are executed many times per step. This means
+# DEBUG_QUERY must be set before the flow starts, e.g. `DEBUG_QUERY=1 python flow.py run`,
+# rather than from inside a step.
+_DEBUG_QUERY = bool(os.getenv("DEBUG_QUERY"))
+
+# matches a PUT/GET statement. Snowflake doesn't allow file transfers in a multi-statement request.
+# Statements start on their own line once they have been tagged; a line inside a statement that happens
+# to start with "put"/"get" just means the batch takes the slower path.
+_FILE_TRANSFER_RE = re.compile(r"^(?:PUT|GET)\s", re.IGNORECASE | re.MULTILINE)
+
 
 def _debug_print_query(query: str) -> None:
-    """Print query if DEBUG_QUERY env var is set.
+    """Print query if DEBUG_QUERY env var was set when this module was imported.
 
     :param query: SQL query to print
     """
-    if os.getenv("DEBUG_QUERY"):
+    if _DEBUG_QUERY:
         print("\n=== DEBUG SQL QUERY ===")
         print(query)
         print("=====================\n")
 
 
-def _execute_sql(conn: SnowflakeConnection, sql: str) -> Optional[SnowflakeCursor]:
-    """Execute SQL statement(s) using Snowflake's ``connection.execute_string()`` and return the *last* resulting cursor.
+def _execute_sql(conn: SnowflakeConnection, sql: str, num_statements: int = 0) -> SnowflakeCursor:
+    """Execute SQL statement(s) on a new cursor and return it positioned on the *last* statement's results.
 
-    Snowflake's ``execute_string`` allows a single string containing multiple SQL
-    statements (separated by semicolons) to be executed at once. Unlike
-    ``cursor.execute()``, which handles exactly one statement and returns a single
-    cursor object, ``execute_string`` returns a **list of cursors**—one cursor for each
-    individual SQL statement in the batch.
+    A single string containing multiple SQL statements (separated by semicolons) is
+    submitted in one request with Snowflake's multi-statement API
+    (``cursor.execute(sql, num_statements=0)``). Unlike ``connection.execute_string()``,
+    this does not split the SQL client-side or allocate a cursor per statement.
+
+    Snowflake doesn't allow PUT/GET in a multi-statement request, so SQL containing one is
+    run with ``connection.execute_string()`` instead, and the last statement's cursor is returned.
 
     :param conn: Snowflake connection object
     :param sql: SQL query or batch of semicolon-delimited SQL statements
-    :return: The cursor corresponding to the last executed statement, or None if no
-            statements were executed or if the SQL contains only whitespace/comments
+    :param num_statements: Exact number of statements in ``sql``, or 0 if unknown
+    :return: The cursor, advanced to the result set of the last executed statement
+    """
+    return _execute_sql_on_cursor(conn.cursor(), sql, num_statements=num_statements)
+
+
+def _execute_sql_on_cursor(cursor: SnowflakeCursor, sql: str, num_statements: int = 0) -> SnowflakeCursor:
+    """Execute SQL statement(s) on an existing cursor and return it positioned on the *last* statement's results.
+
+    The whole batch is submitted in one request with Snowflake's multi-statement API, unless it
+    contains a PUT/GET statement (see ``_iter_sql_results``).
+
+    :param cursor: Snowflake cursor to execute the statement(s) on
+    :param sql: SQL query or batch of semicolon-delimited SQL statements
+    :param num_statements: Exact number of statements in ``sql``, or 0 if unknown
+    :return: The cursor positioned on the result set of the last statement. This is the given
+        cursor, unless the batch had to be run with ``execute_string``.
+    """
+    for cursor in _iter_sql_results(cursor, sql, num_statements=num_statements):
+        pass
+    return cursor
+
+
+def _iter_sql_results(
+    cursor: SnowflakeCursor, sql: str, num_statements: int = 0
+) -> Generator[SnowflakeCursor, None, None]:
+    """Execute SQL statement(s) on an existing cursor and yield it once per statement, in order.
+
+    Each time the cursor is yielded, it is positioned on the result set of the next statement,
+    so results must be fetched before advancing the generator.
+
+    Snowflake rejects PUT/GET statements in a multi-statement request. A batch containing one is
+    run with ``connection.execute_string()`` instead, which executes the statements one at a time
+    on their own cursors; those cursors are yielded in place of the given one.
+
+    :param cursor: Snowflake cursor to execute the statement(s) on
+    :param sql: SQL query or batch of semicolon-delimited SQL statements
+    :param num_statements: Exact number of statements in ``sql``, which Snowflake verifies before
+        running any of them. 0 (the default) allows any number of statements, for SQL whose
+        statement count isn't known up front, e.g. user-provided queries.
     """
     # adding query tags comment in query for cost tracking in select.dev
     sql = add_select_dev_query_tags_to_sql(sql)
     _debug_print_query(sql)
-    cursors: Iterable[SnowflakeCursor] = conn.execute_string(sql.strip())
+    if _FILE_TRANSFER_RE.search(sql):
+        yield from cursor.connection.execute_string(sql.strip())
+        return
 
-    if cursors is None:
-        return None
+    cursor.execute(sql.strip(), num_statements=num_statements)
+    yield cursor
 
-    *_, last = cursors
-    return last
+    while cursor.nextset():
+        yield cursor
@@ -1,13 +1,46 @@
-import uuid
+import re
+import secrets
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Generator, Literal, Optional, Union
+from typing import Any, Generator, Iterator, Literal, Optional, Union
 
 from snowflake.connector.cursor import SnowflakeCursor
 
-from ds_platform_utils._snowflake.run_query import _execute_sql
+from ds_platform_utils._snowflake.run_query import _execute_sql, _execute_sql_on_cursor, _iter_sql_results
 from ds_platform_utils.metaflow._consts import DEV_SCHEMA, PROD_SCHEMA
-from ds_platform_utils.sql_utils import get_query_from_string_or_fpath, substitute_map_into_string
+from ds_platform_utils.sql_utils import (
+    get_query_from_string_or_fpath,
+    split_sql_statements,
+    substitute_map_into_string,
+)
+
+# matches "{{schema}}.{{table_name}}", allowing whitespace around the names and the dot
+_SCHEMA_TABLE_RE = re.compile(r"\{\{\s*schema\s*\}\}\s*\.\s*\{\{\s*table_name\s*\}\}")
+
+# SQL shells for the write-audit-publish bookkeeping statements, filled in with %-formatting
+_CLONE_SQL = """
+        CREATE TABLE IF NOT EXISTS PATTERN_DB.%(schema)s.%(branch)s
+        CLONE PATTERN_DB.%(schema)s.%(table)s;
+        """
+
+_PUBLISH_SQL = """
+    -- create the final table if it does not exist
+    CREATE TABLE IF NOT EXISTS PATTERN_DB.%(to)s.%(table)s
+    CLONE PATTERN_DB.%(from)s.%(branch)s;
+
+    -- swap the audited branch table into the final table
+    ALTER TABLE PATTERN_DB.%(to)s.%(table)s
+    SWAP WITH PATTERN_DB.%(from)s.%(branch)s;
+
+    -- drop the branch table, which now holds the previous version of the final table
+    DROP TABLE IF EXISTS PATTERN_DB.%(from)s.%(branch)s;
+    """
+
+_DROP_SQL = "DROP TABLE IF EXISTS PATTERN_DB.%(schema)s.%(branch)s;"
+
+# upper bound on the number of audits run concurrently when they aren't batched
+_MAX_PARALLEL_AUDITS = 8
 
 
 def write_audit_publish(  # noqa: PLR0913 (too-many-arguments) this fn is an exception
@@ -26,17 +59,28 @@ def write_audit_publish(  # noqa: PLR0913 (too-many-arguments) this fn is an exc
     :param audits: SQL queries that return a single row of boolean values representing assertions
         against PATTERN_DB.{{schema}}.{{table_name}}. If len(audits) == 0, write-audit-publish is not
         performed and the query is simply run against the final table.
+
+    All statements are executed on the given cursor, and the transaction is committed once
+    after the last operation rather than after every statement.
     """
     # gather inputs
     publish_schema = PROD_SCHEMA if is_production else DEV_SCHEMA
     query = get_query_from_string_or_fpath(query)
 
-    audits = audits or []
-    audits = [get_query_from_string_or_fpath(audit) for audit in audits]
+    audit_queries = [get_query_from_string_or_fpath(audit) for audit in audits or []]
 
-    skip_audit_publish = len(audits) == 0
+    skip_audit_publish = len(audit_queries) == 0
+
+    # validate inputs. ctx is substituted later, together with {schema} and {table_name},
+    # so that each query is only templated once
+    if ctx:
+        if "schema" in ctx:
+            raise ValueError(f"Context must not contain 'schema' key--it is derived behind the scenes. Got: {ctx=}")
+        if "table_name" in ctx:
+            raise ValueError(
+                f"Context must not contain 'table_name' key--it is passed as the table_name argument. Got: {ctx=}"
+            )
 
-    # validate inputs
     if not query_contains_parameterized_schema_and_table_name(query):
         raise ValueError(
             "You must use the literal string '{{ schema }}.{{ table_name }}' or '{{schema}}.{{table_name}}' in your query to "
@@ -46,26 +90,17 @@ def write_audit_publish(  # noqa: PLR0913 (too-many-arguments) this fn is an exc
             f"Query:\n{query[:100]}"
         )
 
-    for i, audit_query in enumerate(audits):
-        audit_query = str(audit_query)
-        if not query_contains_parameterized_schema_and_table_name(audit_query):
-            raise ValueError(
-                f"The audit query at index {i} must use the literal string '{{ schema }}.{{ table_name }}' or '{{schema}}.{{table_name}}' to "
-                "reference the table being audited, so that the audit() function can dynamically "
-                "substitute values into these to perform the checks.\n\n"
-                f"Audit query:\n{audit_query[:100]}..."
-            )
-
-    # substitute any values (other than {schema} and {table_name}) into the query and audit queries
-    if ctx:
-        if "schema" in ctx:
-            raise ValueError(f"Context must not contain 'schema' key--it is derived behind the scenes. Got: {ctx=}")
-        if "table_name" in ctx:
-            raise ValueError(
-                f"Context must not contain 'table_name' key--it is passed as the table_name argument. Got: {ctx=}"
-            )
-        query = substitute_map_into_string(query, ctx)
-        audits = [substitute_map_into_string(audit, ctx) for audit in audits]
+    invalid_audit_index = next(
+        (i for i, audit_query in enumerate(audit_queries) if not _SCHEMA_TABLE_RE.search(audit_query)), None
+    )
+    if invalid_audit_index is not None:
+        raise ValueError(
+            f"The audit query at index {invalid_audit_index} must use the literal string "
+            "'{{ schema }}.{{ table_name }}' or '{{schema}}.{{table_name}}' to "
+            "reference the table being audited, so that the audit() function can dynamically "
+            "substitute values into these to perform the checks.\n\n"
+            f"Audit query:\n{audit_queries[invalid_audit_index][:100]}..."
+        )
 
     if skip_audit_publish:
         # If no audits, just write the table directly
@@ -76,6 +111,7 @@ def write_audit_publish(  # noqa: PLR0913 (too-many-arguments) this fn is an exc
             schema=publish_schema,
             cursor=cursor,
             skip_clone_branch=True,  # Skip cloning since we're not auditing
+            ctx=ctx,
         ):
             yield op
     else:
@@ -83,26 +119,27 @@ def write_audit_publish(  # noqa: PLR0913 (too-many-arguments) this fn is an exc
         for op in _write_audit_publish(
             table_name=table_name,
             query=query,
-            audits=audits,
+            audits=audit_queries,
             cursor=cursor,
             is_production=is_production,
             is_test=is_test,
             branch_name=branch_name,
+            ctx=ctx,
         ):
             yield op
 
+    if cursor is not None:
+        cursor.connection.commit()
+
 
 def query_contains_parameterized_schema_and_table_name(query: str) -> bool:
     """Check if the query contains the parameterized schema and table name.
 
     :param query: SQL query to check
-    :return: True if the query contains '{{schema}}.{{table_name}}', False otherwise
+    :return: True if the query contains '{{schema}}.{{table_name}}' (whitespace inside the
+        braces is allowed), False otherwise
     """
-    if "{{schema}}.{{table_name}}" in query:
-        return True
-    if "{{ schema }}.{{ table_name }}" in query:
-        return True
-    return False
+    return _SCHEMA_TABLE_RE.search(query) is not None
 
 
 def _write_audit_publish(  # noqa: PLR0913 (too-many-arguments) this fn is an exception
@@ -113,6 +150,7 @@ def _write_audit_publish(  # noqa: PLR0913 (too-many-arguments) this fn is an ex
     is_production: bool = False,
     is_test: bool = False,
     branch_name: Optional[str] = None,
+    ctx: Optional[dict[str, Any]] = None,
 ) -> Generator["SQLOperation", None, None]:
     """Write table with audit checks and optional production promotion.
 
@@ -122,11 +160,14 @@ def _write_audit_publish(  # noqa: PLR0913 (too-many-arguments) this fn is an ex
     publish_schema = PROD_SCHEMA if is_production else DEV_SCHEMA
 
     # Generate unique branch name
-    branch_name = branch_name or str(uuid.uuid4())[:8]
+    branch_name = branch_name or secrets.token_hex(4)
     if is_test:
         branch_name += "_test"
     branch_table_name = f"{table_name}_{branch_name}"
 
+    # publish() drops the branch table in the same batch as the swap, so cleanup
+    # only needs to run separately if we never made it through publish
+    published = False
     try:
         for op in write(
             query=query,
@@ -134,6 +175,7 @@ def _write_audit_publish(  # noqa: PLR0913 (too-many-arguments) this fn is an ex
             branch_table_name=branch_table_name,
             schema=audit_schema,
             cursor=cursor,
+            ctx=ctx,
         ):
             yield op
 
@@ -142,31 +184,36 @@ def _write_audit_publish(  # noqa: PLR0913 (too-many-arguments) this fn is an ex
             schema=audit_schema,
             audits=audits,
             cursor=cursor,
+            ctx=ctx,
         ):
             yield op
 
         for op in publish(
             table_name=table_name,
-            branch_name=branch_name,
+            branch_table_name=branch_table_name,
             from_schema=audit_schema,
             to_schema=publish_schema,
             cursor=cursor,
         ):
             yield op
+        published = True
 
     finally:
-        cleanup(
-            table_name=table_name,
-            branch_name=branch_name,
-            schema=audit_schema,
-            cursor=cursor,
-        )
+        if not published:
+            cleanup(
+                branch_table_name=branch_table_name,
+                schema=audit_schema,
+                cursor=cursor,
+            )
 
 
 @dataclass
 class SQLOperation:
     """SQL operation details."""
 
+    # declared by hand rather than with dataclass(slots=True), which needs Python 3.10+
+    __slots__ = ("query", "schema", "table_name", "operation_type")
+
     query: str
     schema: str
     table_name: str
@@ -177,22 +224,24 @@ class SQLOperation:
 class AuditSQLOperation(SQLOperation):
     """SQL operation details for audits, including results."""
 
+    __slots__ = ("results",)
+
     results: dict[str, Any]
 
 
-def run_query(query: str, cursor: Optional[SnowflakeCursor] = None) -> None:
+def run_query(query: str, cursor: Optional[SnowflakeCursor] = None, num_statements: int = 0) -> None:
     """Execute one or more SQL statements.
 
     :param query: SQL query or queries to execute. Multiple statements must be separated by semicolons.
     :param cursor: Snowflake cursor. If None, prints query instead of executing
+    :param num_statements: Exact number of statements in the query, if known. 0 allows any number.
     """
     if cursor is None:
         print(f"Would execute query:\n{query}")
         return
 
-    # run the query using _execute_sql utility which handles multiple statements via execute_string
-    _execute_sql(cursor.connection, query)
-    cursor.connection.commit()
+    # reuse the caller's cursor for every statement; committing is left to write_audit_publish()
+    _execute_sql_on_cursor(cursor, query, num_statements=num_statements)
 
 
 def run_audit_query(query: str, cursor: Optional[SnowflakeCursor] = None) -> dict[str, Any]:
@@ -204,10 +253,53 @@ def run_audit_query(query: str, cursor: Optional[SnowflakeCursor] = None) -> dic
     if cursor is None:
         return {"mock_result": True}
 
-    cursor = _execute_sql(cursor.connection, query)
+    cursor = _execute_sql_on_cursor(cursor, query)
+    return _fetch_audit_result(cursor)
+
+
+def run_audit_queries(queries: list[str], cursor: Optional[SnowflakeCursor] = None) -> list[dict[str, Any]]:
+    """Execute several single-statement audit queries in one request and return their results, in order.
+
+    :param queries: SQL queries that each consist of a single statement returning a single row of boolean values
+    :param cursor: Snowflake cursor. If None, returns mock successful results
+    """
     if cursor is None:
-        return {}
+        return [{"mock_result": True} for _ in queries]
+
+    # nothing to submit; an empty batch would be rejected as containing no SQL statements
+    if not queries:
+        return []
+
+    batch_sql = "\n".join(query if query.endswith(";") else f"{query};" for query in queries)
+    return [
+        _fetch_audit_result(result_cursor)
+        for result_cursor in _iter_sql_results(cursor, batch_sql, num_statements=len(queries))
+    ]
+
+
+def run_audit_queries_concurrently(queries: list[str], cursor: SnowflakeCursor) -> Iterator[dict[str, Any]]:
+    """Execute audit queries concurrently, each on a new cursor, and yield their results in order.
+
+    :param queries: SQL queries that return a single row of boolean values
+    :param cursor: Snowflake cursor whose connection the audits are run on
+    """
+    if not queries:
+        return
+
+    connection = cursor.connection
+
+    def _run(query: str) -> dict[str, Any]:
+        with connection.cursor() as audit_cursor:
+            return run_audit_query(query=query, cursor=audit_cursor)
+
+    with ThreadPoolExecutor(max_workers=min(len(queries), _MAX_PARALLEL_AUDITS)) as executor:
+        futures = [executor.submit(_run, query) for query in queries]
+        for future in futures:
+            yield future.result()
 
+
+def _fetch_audit_result(cursor: SnowflakeCursor) -> dict[str, Any]:
+    """Fetch the single row of an audit query from the cursor's current result set."""
     result = cursor.fetchone()
     if not result:
         return {}
@@ -242,9 +334,6 @@ def fetch_table_preview(
         LIMIT {n_rows};
         """,
     )
-    if cursor is None:
-        return []
-
     columns = [col[0] for col in cursor.description]
     rows = cursor.fetchall()
     return [dict(zip(columns, row)) for row in rows]
@@ -257,6 +346,7 @@ def write(  # noqa: PLR0913 (too-many-arguments)
     schema: str,
     cursor: Optional[SnowflakeCursor] = None,
     skip_clone_branch: bool = False,
+    ctx: Optional[dict[str, Any]] = None,
 ) -> Generator[SQLOperation, None, None]:
     """Write table to a temporary branch table, attempting to clone existing table first.
 
@@ -268,14 +358,12 @@ def write(  # noqa: PLR0913 (too-many-arguments)
     :param skip_clone_branch: If True, skip the cloning step and just run the query. Used when
         there are no audits to run, so write-audit-publish is skipped, and data is simply written
         directly to the final table.
+    :param ctx: Additional values to substitute into the query along with schema and table_name
     """
     if not skip_clone_branch:
         # First, we need to make sure a branch table exists, incase this query is trying to
         # INSERT or otherwise modify an existing table, but isn't creating it.
-        clone_query = f"""
-        CREATE TABLE IF NOT EXISTS PATTERN_DB.{schema}.{branch_table_name}
-        CLONE PATTERN_DB.{schema}.{table_name};
-        """
+        clone_query = _CLONE_SQL % {"schema": schema, "branch": branch_table_name, "table": table_name}
 
         clone_op = SQLOperation(
             query=clone_query,
@@ -285,10 +373,10 @@ def write(  # noqa: PLR0913 (too-many-arguments)
         )
         yield clone_op
 
-        run_query(query=clone_query, cursor=cursor)
-
     # Now that we know the branch table exists, we can run the main query
-    formatted_query = substitute_map_into_string(query, {"schema": schema, "table_name": branch_table_name})
+    formatted_query = substitute_map_into_string(
+        query, {**(ctx or {}), "schema": schema, "table_name": branch_table_name}
+    )
     write_op = SQLOperation(
         query=formatted_query,
         schema=schema,
@@ -297,23 +385,44 @@ def write(  # noqa: PLR0913 (too-many-arguments)
     )
     yield write_op
 
-    run_query(query=formatted_query, cursor=cursor)
+    # the clone and the write are submitted as a single batch to save a round-trip. The write
+    # depends on the clone, so submitting the clone asynchronously (execute_async) would only
+    # overlap it with the local substitution above and still cost a separate request.
+    run_query(query=formatted_query if skip_clone_branch else clone_query + formatted_query, cursor=cursor)
 
 
-def audit(
+def audit(  # noqa: PLR0913 (too-many-arguments)
     table_name: str,
     schema: str,
     audits: list[str],
     cursor: Optional[SnowflakeCursor] = None,
+    batch_audits: bool = True,
+    ctx: Optional[dict[str, Any]] = None,
 ) -> Generator[SQLOperation, None, None]:
-    """Run audit queries and raise error if any fail."""
+    """Run audit queries and raise error if any fail.
+
+    :param batch_audits: If True, submit all audits to Snowflake in a single request (one round-trip),
+        in which Snowflake runs them one after another. If False, or if any audit contains more than
+        one SQL statement (their results can't be told apart in a batch), the audits are instead run
+        concurrently, each on its own cursor. Batching suits cheap audits; running concurrently suits
+        audits with heavy compute.
+    :param ctx: Additional values to substitute into the audits along with schema and table_name
+    """
     failed_audits = []
 
-    for i, audit_query in enumerate(audits, 1):
-        formatted_query = substitute_map_into_string(audit_query, {"schema": schema, "table_name": table_name})
+    values = {**(ctx or {}), "schema": schema, "table_name": table_name}
+    formatted_queries = [substitute_map_into_string(audit_query, values) for audit_query in audits]
 
-        result_dict = run_audit_query(query=formatted_query, cursor=cursor)
+    audit_statements = [split_sql_statements(query) for query in formatted_queries]
+    results: Iterator[dict[str, Any]]
+    if batch_audits and all(len(statements) == 1 for statements in audit_statements):
+        results = iter(run_audit_queries([statements[0] for statements in audit_statements], cursor=cursor))
+    elif cursor is None:
+        results = (run_audit_query(query=query, cursor=cursor) for query in formatted_queries)
+    else:
+        results = run_audit_queries_concurrently(formatted_queries, cursor=cursor)
 
+    for i, (formatted_query, result_dict) in enumerate(zip(formatted_queries, results), 1):
         yield AuditSQLOperation(
             query=formatted_query,
             schema=schema,
@@ -322,10 +431,9 @@ def audit(
             operation_type="audit",
         )
 
-        # Check which assertions failed
-        failed_assertions = [assertion_name for assertion_name, passed in result_dict.items() if not bool(passed)]
-
-        if failed_assertions:
+        # Check which assertions failed, only collecting their names if any did
+        if not all(result_dict.values()):
+            failed_assertions = [assertion_name for assertion_name, passed in result_dict.items() if not passed]
             failed_audits.append(f"Audit #{i} failed assertions: {', '.join(failed_assertions)}")
 
     if failed_audits:
@@ -336,33 +444,30 @@ def audit(
 
 def publish(
     table_name: str,
-    branch_name: str,
+    branch_table_name: str,
     from_schema: str,
     to_schema: str,
     cursor: Optional[SnowflakeCursor] = None,
 ) -> Generator[SQLOperation, None, None]:
-    """Promote branch table to final table using SWAP.
+    """Promote branch table to final table using SWAP, then drop the branch table.
 
     SWAP is a zero-copy operation that copies the metadata (a pointer)
-    of the source table to the target table.
+    of the source table to the target table. After the swap, the branch table
+    holds the previous contents of the final table, so it is dropped in the same
+    batch rather than in a separate cleanup() round-trip.
 
     :param table_name: Name of the final table
-    :param branch_name: Name of the branch/temporary table
+    :param branch_table_name: Name of the branch/temporary table
     :param from_schema: Source schema containing the branch table
     :param to_schema: Target schema for the final table
     :param cursor: Optional Snowflake cursor
     """
-    branch_table = f"{table_name}_{branch_name}"
-
-    create_query = f"""
-    -- create the final table if it does not exist
-    CREATE TABLE IF NOT EXISTS PATTERN_DB.{to_schema}.{table_name}
-    CLONE PATTERN_DB.{from_schema}.{branch_table};
-
-    -- swap the audited branch table into the final table
-    ALTER TABLE PATTERN_DB.{to_schema}.{table_name}
-    SWAP WITH PATTERN_DB.{from_schema}.{branch_table};
-    """
+    create_query = _PUBLISH_SQL % {
+        "to": to_schema,
+        "from": from_schema,
+        "table": table_name,
+        "branch": branch_table_name,
+    }
 
     create_op = SQLOperation(
         query=create_query,
@@ -372,20 +477,18 @@ def publish(
     )
     yield create_op
 
-    run_query(query=create_query, cursor=cursor)
+    run_query(query=create_query, cursor=cursor, num_statements=3)
 
 
 def cleanup(
-    table_name: str,
-    branch_name: str,
+    branch_table_name: str,
     schema: str,
     cursor: Optional[SnowflakeCursor] = None,
 ) -> None:
     """Drop temporary branch table."""
-    branch_table = f"{table_name}_{branch_name}"
-    drop_query = f"DROP TABLE IF EXISTS PATTERN_DB.{schema}.{branch_table};"
-    print(f"Dropping temp table: {schema}.{branch_table}")
-    run_query(query=drop_query, cursor=cursor)
+    drop_query = _DROP_SQL % {"schema": schema, "branch": branch_table_name}
+    print(f"Dropping temp table: {schema}.{branch_table_name}")
+    run_query(query=drop_query, cursor=cursor, num_statements=1)
 
 
 if __name__ == "__main__":
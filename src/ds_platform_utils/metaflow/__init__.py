@@ -1,14 +1,48 @@
-from .batch_inference_pipeline import BatchInferencePipeline
-from .pandas import publish_pandas, query_pandas_from_snowflake
+import importlib
+from typing import TYPE_CHECKING, Any
+
+# the function has the same name as its submodule, so it is bound eagerly: importing the submodule first would
+# otherwise set the package attribute to the module, and __getattr__ would never run. It only pulls in metaflow.
 from .restore_step_state import restore_step_state
-from .validate_config import make_pydantic_parser_fn
-from .write_audit_publish import publish
+
+if TYPE_CHECKING:
+    from .batch_inference_pipeline import BatchInferencePipeline
+    from .pandas import publish_pandas, query_arrow_from_snowflake, query_pandas_from_snowflake
+    from .validate_config import make_pydantic_parser_fn
+    from .write_audit_publish import publish
 
 __all__ = [
     "BatchInferencePipeline",
     "make_pydantic_parser_fn",
     "publish",
     "publish_pandas",
+    "query_arrow_from_snowflake",
     "query_pandas_from_snowflake",
     "restore_step_state",
 ]
+
+# Most of these modules import the Snowflake connector, pandas, polars and pyarrow. Import them on first
+# use, so that e.g. `from ds_platform_utils.metaflow import make_pydantic_parser_fn` in a flow doesn't
+# load all of those into every step.
+_EXPORT_MODULES = {
+    "BatchInferencePipeline": ".batch_inference_pipeline",
+    "make_pydantic_parser_fn": ".validate_config",
+    "publish": ".write_audit_publish",
+    "publish_pandas": ".pandas",
+    "query_arrow_from_snowflake": ".pandas",
+    "query_pandas_from_snowflake": ".pandas",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORT_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(_EXPORT_MODULES[name], __name__), name)
+    # store it on the package, so later lookups don't go through __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(__all__))
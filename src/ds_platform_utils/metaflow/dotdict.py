@@ -26,7 +26,7 @@ so that the attributes like `self.config` are accessible using dot notation when
 
 from __future__ import annotations
 
-from typing import Any, Mapping, MutableMapping
+from typing import Any, MutableMapping
 
 
 class DotDict(dict):
@@ -40,15 +40,12 @@ class DotDict(dict):
 
     def __getattr__(self, attr: str) -> Any:
         """Retrieve a value from the dictionary via attribute access."""
+        # Python only calls __getattr__ once normal attribute lookup (methods like
+        # ``keys``, private attributes, etc.) has already failed, so go straight to the keys.
         try:
-            # First attempt normal attribute access on the dict itself.
-            return super().__getattribute__(attr)
-        except AttributeError:
-            # Fallback: if the attribute name is a key in the dict,
-            # return the associated value. Otherwise propagate the error.
-            if attr in self:
-                return self[attr]
-            raise
+            return dict.__getitem__(self, attr)
+        except KeyError:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {attr!r}") from None
 
     def __setattr__(self, attr: str, value: Any) -> None:
         """Assign a value to a key via attribute access."""
@@ -66,14 +63,6 @@ class DotDict(dict):
             super().__delattr__(attr)
 
 
-def _all_string_keys(mapping: Mapping[Any, Any]) -> bool:
-    """Return ``True`` if all keys in ``mapping`` are strings."""
-    for k in mapping:
-        if not isinstance(k, str):
-            return False
-    return True
-
-
 def convert_to_dotdict(obj: Any) -> Any:
     """Recursively convert dictionaries with all-string keys into ``DotDict``.
 
@@ -90,6 +79,8 @@ def convert_to_dotdict(obj: Any) -> Any:
     type with their contents converted; mutable sequences (e.g., lists)
     are returned as lists with converted contents.
 
+    Key types are checked while the values are converted, so each mapping is only traversed once.
+
     :param obj: The object to convert.
 
     :return: A converted version of ``obj`` where eligible mappings are
@@ -99,20 +90,17 @@ def convert_to_dotdict(obj: Any) -> Any:
     # instances and other mutable mappings. Immutable mappings (from
     # typing.Mapping) are also accepted.
     if isinstance(obj, MutableMapping):
-        # Determine if all keys are strings; if not, we still need to
-        # recursively convert nested structures in the values.
-        if _all_string_keys(obj):
-            # Construct a new DotDict and recursively convert children.
-            converted = DotDict()
-            for key, val in obj.items():
-                converted[key] = convert_to_dotdict(val)
-            return converted
-        else:
-            # Keep the original mapping type but convert nested mappings.
-            new_mapping: MutableMapping[Any, Any] = obj.__class__()
-            for key, val in obj.items():
-                new_mapping[key] = convert_to_dotdict(val)
-            return new_mapping
+        converted: MutableMapping[Any, Any] = DotDict()
+        all_string_keys = True
+        for key, val in obj.items():
+            if all_string_keys and not isinstance(key, str):
+                # Keep the original mapping type, but still convert nested mappings.
+                all_string_keys = False
+                new_mapping: MutableMapping[Any, Any] = obj.__class__()
+                new_mapping.update(converted)
+                converted = new_mapping
+            converted[key] = convert_to_dotdict(val)
+        return converted
 
     # Convert lists, tuples, sets, and other iterables that are not strings
     # or bytes. Strings and bytes are iterable but should be treated as
@@ -1,40 +1,39 @@
-from datetime import datetime
+import math
 from pathlib import Path
 from typing import Any, Dict, List, Literal, Optional, Tuple, Union
 
 import pandas as pd
 import pyarrow
-import pytz
 from metaflow import current
 from metaflow.cards import Markdown, Table
 from snowflake.connector import SnowflakeConnection
 from snowflake.connector.pandas_tools import write_pandas
 
 from ds_platform_utils._snowflake.run_query import _execute_sql
-from ds_platform_utils.metaflow._consts import (
-    DEV_SCHEMA,
-    PROD_SCHEMA,
-)
 from ds_platform_utils.metaflow.s3 import _get_df_from_s3_folder, _put_df_to_s3_folder
 from ds_platform_utils.metaflow.s3_stage import (
     _copy_s3_to_snowflake,
     _copy_snowflake_to_s3,
     _generate_s3_stage_paths,
 )
-from ds_platform_utils.metaflow.snowflake_connection import get_snowflake_connection
+from ds_platform_utils.metaflow.snowflake_connection import _get_schema, get_snowflake_connection
 from ds_platform_utils.metaflow.write_audit_publish import (
     _make_snowflake_table_url,
 )
 from ds_platform_utils.pandas_utils import estimate_chunk_size
 from ds_platform_utils.sql_utils import get_query_from_string_or_fpath, substitute_map_into_string
 
+# max number of columns shown in card previews; converting every cell of a wide table into a
+# card component is slow, and wide tables don't display usefully in a card anyway
+_PREVIEW_MAX_COLUMNS = 20
+
 
 def publish_pandas(  # noqa: PLR0913 (too many arguments)
     table_name: str,
     df: pd.DataFrame,
     add_created_date: bool = False,
     chunk_size: Optional[int] = None,
-    compression: Literal["snappy", "gzip"] = "snappy",
+    compression: Literal["snappy", "gzip", "zstd"] = "snappy",
     warehouse: Optional[Union[Literal["XS", "MED", "XL"], str]] = None,
     parallel: int = 4,
     quote_identifiers: bool = False,
@@ -44,6 +43,7 @@ def publish_pandas(  # noqa: PLR0913 (too many arguments)
     use_utc: bool = True,
     use_s3_stage: bool = False,
     table_definition: Optional[List[Tuple[str, str]]] = None,
+    use_vectorized_scanner: bool = False,
 ) -> None:
     """Store a pandas dataframe as a Snowflake table.
 
@@ -57,10 +57,13 @@ def publish_pandas(  # noqa: PLR0913 (too many arguments)
         timestamp in UTC.
 
     :param chunk_size: Number of rows to be inserted once. If not provided, the chunk size will be
-        automatically estimated based on the DataFrame's memory usage.
+        automatically estimated based on the DataFrame's memory usage, and capped so that there are
+        at least `parallel` chunks to upload.
 
-    :param compression: The compression used on the Parquet files: gzip or snappy.
+    :param compression: The compression used on the Parquet files: gzip, snappy or zstd.
         Gzip gives supposedly a better compression, while snappy is faster. Use whichever is more appropriate.
+        Zstd compresses about as fast as snappy with a ratio close to gzip's, so it uploads fewer bytes,
+        but it is only supported when `use_s3_stage` is True (`write_pandas` only accepts gzip or snappy).
 
     :param warehouse: The Snowflake warehouse to use for this operation. If not specified,
         it defaults to the `OUTERBOUNDS_DATA_SCIENCE_SHARED_DEV_XS_WH` warehouse,
@@ -68,6 +71,7 @@ def publish_pandas(  # noqa: PLR0913 (too many arguments)
         `OUTERBOUNDS_DATA_SCIENCE_SHARED_PROD_XS_WH` warehouse, when running in the Outerbounds **PROD** perimeter.
 
     :param parallel: Number of threads to be used when uploading chunks. See details at parallel parameter.
+        When `use_s3_stage` is True, it is also the number of threads encoding the chunks to Parquet.
 
     :param quote_identifiers: If set to True, identifiers, specifically database, schema, table and column names
         (from df.columns) will be quoted. If set to False (default), identifiers are passed on to Snowflake without
@@ -89,30 +93,43 @@ def publish_pandas(  # noqa: PLR0913 (too many arguments)
 
     :param table_definition: Optional list of tuples specifying the column names and types for the Snowflake table.
         This is only used when `use_s3_stage` is True, and is required in that case. The list should be in the format: `[(col_name1, col_type1), (col_name2, col_type2), ...]`, where `col_type` is a valid Snowflake data type (e.g., 'STRING', 'NUMBER', 'TIMESTAMP_NTZ', etc.).
+
+    :param use_vectorized_scanner: Whether Snowflake loads the Parquet files with its vectorized scanner, which is
+        considerably faster for wide tables. Its type conversions can differ slightly from the default scanner's,
+        so it is off by default.
     """
     if not isinstance(df, pd.DataFrame):
         raise TypeError("df must be a pandas DataFrame.")
 
-    if df.empty:
+    # Same check as `df.empty`, without the generic per-axis lookup it goes through
+    if len(df.index) == 0 or len(df.columns) == 0:
         raise ValueError("DataFrame is empty.")
 
     if add_created_date:
-        df["created_date"] = datetime.now().astimezone(pytz.utc)
+        # a pandas Timestamp broadcasts straight into a datetime64[ns, UTC] column
+        df["created_date"] = pd.Timestamp.now(tz="UTC")
 
     if chunk_size is not None and chunk_size <= 0:
         raise ValueError("chunk_size must be a positive integer.")
 
+    if compression == "zstd" and not use_s3_stage:
+        raise ValueError("zstd compression is only supported when use_s3_stage is True.")
+
     if chunk_size is None:
-        chunk_size = estimate_chunk_size(df)
+        # split into at least one chunk per upload thread, so that all `parallel` threads are used
+        chunk_size = min(estimate_chunk_size(df), math.ceil(len(df) / max(parallel, 1)))
 
     table_name = table_name.upper()
-    schema = PROD_SCHEMA if current.is_production else DEV_SCHEMA
+    schema = _get_schema()
 
-    # Preview the DataFrame in the Metaflow card
-    if warehouse is not None:
-        current.card.append(Markdown(f"## Using Snowflake Warehouse: `{warehouse}`"))
-    current.card.append(Markdown(f"## Publishing DataFrame to Snowflake table: `{table_name}`"))
-    current.card.append(Table.from_dataframe(df.head()))
+    # Preview the DataFrame in the Metaflow card (there is no card when state is restored with restore_step_state)
+    if current.card:
+        card_components = []
+        if warehouse is not None:
+            card_components.append(Markdown(f"## Using Snowflake Warehouse: `{warehouse}`"))
+        card_components.append(Markdown(f"## Publishing DataFrame to Snowflake table: `{table_name}`"))
+        card_components.extend(_preview_card_components(df))
+        current.card.extend(card_components)
 
     if use_s3_stage:
         s3_path, _ = _generate_s3_stage_paths()
@@ -123,6 +140,7 @@ def publish_pandas(  # noqa: PLR0913 (too many arguments)
             path=s3_path,
             chunk_size=chunk_size,
             compression=compression,
+            parallel=parallel,
         )
 
         _copy_s3_to_snowflake(
@@ -134,17 +152,20 @@ def publish_pandas(  # noqa: PLR0913 (too many arguments)
             auto_create_table=auto_create_table,
             overwrite=overwrite,
             use_logical_type=use_logical_type,
+            use_vectorized_scanner=use_vectorized_scanner,
         )
 
     else:
         conn: SnowflakeConnection = get_snowflake_connection(warehouse=warehouse, use_utc=use_utc)
-        _execute_sql(conn, f"USE SCHEMA PATTERN_DB.{schema};")
 
         # https://docs.snowflake.com/en/developer-guide/python-connector/python-connector-api#module-snowflake-connector-pandas-tools
         write_pandas(
             conn=conn,
             df=df,
             table_name=table_name,
+            # write_pandas fully qualifies the table, stage and file format with these,
+            # so no separate USE SCHEMA round-trip is needed
+            database="PATTERN_DB",
             schema=schema,
             chunk_size=chunk_size,
             compression=compression,
@@ -153,16 +174,20 @@ def publish_pandas(  # noqa: PLR0913 (too many arguments)
             auto_create_table=auto_create_table,
             overwrite=overwrite,
             use_logical_type=use_logical_type,
+            use_vectorized_scanner=use_vectorized_scanner,
+            # write all chunks first, then upload them with one wildcard PUT that uses all `parallel`
+            # threads, instead of serializing and uploading one chunk at a time
+            bulk_upload_chunks=True,
         )
-        conn.close()
 
     # Add a link to the table in Snowflake to the card
-    table_url = _make_snowflake_table_url(
-        database="PATTERN_DB",
-        schema=schema,
-        table=table_name,
-    )
-    current.card.append(Markdown(f"[View table in Snowflake]({table_url})"))
+    if current.card:
+        table_url = _make_snowflake_table_url(
+            database="PATTERN_DB",
+            schema=schema,
+            table=table_name,
+        )
+        current.card.append(Markdown(f"[View table in Snowflake]({table_url})"))
 
 
 def query_pandas_from_snowflake(
@@ -193,18 +218,8 @@ def query_pandas_from_snowflake(
     If the `ctx` dictionary is provided, it will be used to substitute values into the query string.
     The keys in the `ctx` dictionary should match the placeholders in the query string.
     """
-    schema = PROD_SCHEMA if current.is_production else DEV_SCHEMA
-
-    # adding query tags comment in query for cost tracking in select.dev
-
-    query = get_query_from_string_or_fpath(query)
-
-    query = substitute_map_into_string(query, (ctx or {}) | {"schema": schema})
-
-    if warehouse is not None:
-        current.card.append(Markdown(f"## Using Snowflake Warehouse: `{warehouse}`"))
-    current.card.append(Markdown("## Querying Snowflake Table"))
-    current.card.append(Markdown(f"```sql\n{query}\n```"))
+    schema = _get_schema()
+    query = _prepare_query(query, schema=schema, warehouse=warehouse, ctx=ctx)
 
     if use_s3_stage:
         s3_path = _copy_snowflake_to_s3(
@@ -213,20 +228,89 @@ def query_pandas_from_snowflake(
             use_utc=use_utc,
         )
         df = _get_df_from_s3_folder(s3_path)
+        # a plain list comprehension; the `.str` accessor costs far more for a handful of names
+        df.columns = [column.lower() for column in df.columns]
     else:
-        conn: SnowflakeConnection = get_snowflake_connection(warehouse=warehouse, use_utc=use_utc)
-        _execute_sql(conn, f"USE SCHEMA PATTERN_DB.{schema};")
-        cursor_result = _execute_sql(conn, query)
-        if cursor_result is None:
-            # No statements to execute, return empty DataFrame
-            df = pd.DataFrame()
-        else:
-            # force_return_table=True -- returns a Pyarrow Table always even if the result is empty
-            result: pyarrow.Table = cursor_result.fetch_arrow_all(force_return_table=True)
-            df = result.to_pandas()
-        conn.close()
-    df.columns = df.columns.str.lower()
-    current.card.append(Markdown("### Query Result"))
-    current.card.append(Table.from_dataframe(df.head()))
+        df = _fetch_arrow_from_snowflake(query, schema=schema, warehouse=warehouse, use_utc=use_utc).to_pandas()
+    if current.card:
+        current.card.extend([Markdown("### Query Result"), *_preview_card_components(df)])
 
     return df
+
+
+def query_arrow_from_snowflake(
+    query: Union[str, Path],
+    warehouse: Optional[Union[Literal["XS", "MED", "XL"], str]] = None,
+    ctx: Optional[Dict[str, Any]] = None,
+    use_utc: bool = True,
+) -> pyarrow.Table:
+    """Returns a pyarrow Table from a Snowflake query.
+
+    Works like `query_pandas_from_snowflake`, but returns the Arrow result as-is, skipping the
+    conversion to pandas (which creates a Python object per value in string columns).
+
+    :param query: SQL query string or path to a .sql file.
+    :param warehouse: The Snowflake warehouse to use for this operation. If not specified,
+        it defaults to the `OUTERBOUNDS_DATA_SCIENCE_SHARED_DEV_XS_WH` warehouse,
+        when running in the Outerbounds **Default** perimeter, and to the
+        `OUTERBOUNDS_DATA_SCIENCE_SHARED_PROD_XS_WH` warehouse, when running in the Outerbounds **PROD** perimeter.
+    :param ctx: Context dictionary to substitute into the query string.
+    :param use_utc: Whether to set the Snowflake session to use UTC time zone. Default is True.
+    :return: pyarrow Table containing the results of the query, with lowercase column names.
+    """
+    schema = _get_schema()
+    query = _prepare_query(query, schema=schema, warehouse=warehouse, ctx=ctx)
+
+    table = _fetch_arrow_from_snowflake(query, schema=schema, warehouse=warehouse, use_utc=use_utc)
+    if current.card:
+        current.card.extend([Markdown("### Query Result"), *_preview_card_components(table.slice(0, 5).to_pandas())])
+
+    return table
+
+
+def _prepare_query(
+    query: Union[str, Path],
+    schema: str,
+    warehouse: Optional[str],
+    ctx: Optional[Dict[str, Any]],
+) -> str:
+    """Read and template a query, and add it to the Metaflow card (if there is one)."""
+    query = get_query_from_string_or_fpath(query)
+    query = substitute_map_into_string(query, (ctx or {}) | {"schema": schema})
+
+    if current.card:
+        card_components = []
+        if warehouse is not None:
+            card_components.append(Markdown(f"## Using Snowflake Warehouse: `{warehouse}`"))
+        card_components.append(Markdown("## Querying Snowflake Table"))
+        card_components.append(Markdown(f"```sql\n{query}\n```"))
+        current.card.extend(card_components)
+
+    return query
+
+
+def _fetch_arrow_from_snowflake(
+    query: str,
+    schema: str,
+    warehouse: Optional[str],
+    use_utc: bool,
+) -> pyarrow.Table:
+    """Run a query and fetch its result as a pyarrow Table with lowercase column names."""
+    conn: SnowflakeConnection = get_snowflake_connection(warehouse=warehouse, use_utc=use_utc)
+    # set the schema in the same request as the query, to save a round-trip;
+    # the cursor is left on the results of the query's (last) statement
+    cursor_result = _execute_sql(conn, f"USE SCHEMA PATTERN_DB.{schema};\n{query}")
+    # force_return_table=True -- returns a Pyarrow Table always even if the result is empty
+    result: pyarrow.Table = cursor_result.fetch_arrow_all(force_return_table=True)
+    # lowercase column names on the Arrow schema, which is a metadata-only change
+    return result.rename_columns([name.lower() for name in result.column_names])
+
+
+def _preview_card_components(df: pd.DataFrame, n_rows: int = 5) -> list:
+    """Return Metaflow card components previewing the first rows and columns of a DataFrame."""
+    components = []
+    n_columns = df.shape[1]
+    if n_columns > _PREVIEW_MAX_COLUMNS:
+        components.append(Markdown(f"Showing the first {_PREVIEW_MAX_COLUMNS} of {n_columns} columns."))
+    components.append(Table.from_dataframe(df.iloc[:n_rows, :_PREVIEW_MAX_COLUMNS]))
+    return components
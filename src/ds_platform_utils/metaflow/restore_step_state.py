@@ -19,17 +19,26 @@ class RestoredFlowState:
         self.run = run
         self._step_name = step_name
         self._step = run[step_name]
-        self._task_data = self._step.task.data if self._step.task else None
+        # `Step.task` lists the step's tasks from the metadata service on every access, so look it up once
+        task = self._step.task
+        self._task_data = task.data if task else None
 
     def __getattr__(self, item: str):
-        """Proxy access to the `run.data` attributes."""
-        if self._task_data and hasattr(self._task_data, item):
+        """Proxy access to the `run.data` attributes.
+
+        Each attribute is loaded (and converted) once, then stored on the instance, so later accesses
+        return the same object without calling __getattr__ again, just like `self.` in a step.
+        """
+        # check membership with `in`: hasattr() on MetaflowData would already load and unpickle
+        # the artifact, and getattr() would then load it a second time
+        if self._task_data is not None and item in self._task_data:
             attr = getattr(self._task_data, item)
 
             # make nested dict[str, Any] accessible using dot notation;
             # use case: self.config and other flow configs
             if isinstance(attr, dict):
                 attr = convert_to_dotdict(attr)
+            self.__dict__[item] = attr
             return attr
 
         raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{item}'")
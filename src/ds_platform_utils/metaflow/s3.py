@@ -1,8 +1,12 @@
+import math
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import pandas as pd
 import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
 from metaflow import S3, current
 
 
@@ -72,20 +76,31 @@ def _put_df_to_s3_file(df: pd.DataFrame, path: str) -> None:
             s3.put_files(key_paths=[[path, tmp_file.name]])
 
 
-def _put_df_to_s3_folder(df: pd.DataFrame, path: str, chunk_size: int, compression="snappy") -> None:
+def _put_df_to_s3_folder(
+    df: pd.DataFrame, path: str, chunk_size: int, compression="snappy", parallel: int = 4
+) -> None:
     if not path.startswith("s3://"):
         raise ValueError("Invalid S3 URI. Must start with 's3://'.")
 
     path = path.rstrip("/")  # Remove trailing slash if present
 
+    # every file gets the same schema. It is inferred from the whole DataFrame (one column at a time), since a
+    # column may only be null in the first rows; the chunks themselves are converted to Arrow one at a time.
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+
     with tempfile.TemporaryDirectory(prefix=str(Path(current.tempdir).absolute()) + "/") as temp_dir:  # type: ignore
         with _get_metaflow_s3_client() as s3:
             template_path = f"{temp_dir}/data_part_{{}}.parquet"
-            key_paths = []
-            num_rows = df.shape[0]
-            for i in range(0, num_rows, chunk_size):
-                local_path = template_path.format(i // chunk_size)
-                df.iloc[i : i + chunk_size].to_parquet(local_path, index=False, compression=compression)
-                s3_path = f"{path}/data_part_{i // chunk_size}.parquet"
-                key_paths.append([s3_path, local_path])
+
+            def _write_part(part: int) -> list:
+                local_path = template_path.format(part)
+                chunk = df.iloc[part * chunk_size : (part + 1) * chunk_size]
+                table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                pq.write_table(table, local_path, compression=compression)
+                return [f"{path}/data_part_{part}.parquet", local_path]
+
+            # Arrow's Parquet writer releases the GIL, so the parts are encoded in parallel threads
+            num_parts = math.ceil(len(df) / chunk_size)
+            with ThreadPoolExecutor(max_workers=max(parallel, 1)) as executor:
+                key_paths = list(executor.map(_write_part, range(num_parts)))
             s3.put_files(key_paths=key_paths)
@@ -7,14 +7,12 @@ from metaflow import current
 from ds_platform_utils._snowflake.run_query import _execute_sql
 from ds_platform_utils.metaflow._consts import (
     DEV_S3_BUCKET,
-    DEV_SCHEMA,
     DEV_SNOWFLAKE_STAGE,
     PROD_S3_BUCKET,
-    PROD_SCHEMA,
     PROD_SNOWFLAKE_STAGE,
     S3_DATA_FOLDER,
 )
-from ds_platform_utils.metaflow.snowflake_connection import get_snowflake_connection
+from ds_platform_utils.metaflow.snowflake_connection import _get_schema, get_snowflake_connection
 
 
 def _get_s3_config(is_production: bool) -> Tuple[str, str]:
@@ -89,6 +87,7 @@ def _generate_s3_to_snowflake_copy_query(  # noqa: PLR0913
     overwrite: bool = True,
     auto_create_table: bool = True,
     use_logical_type: bool = True,
+    use_vectorized_scanner: bool = False,
 ) -> str:
     """Generate SQL commands to load data from S3 to Snowflake table.
 
@@ -103,6 +102,7 @@ def _generate_s3_to_snowflake_copy_query(  # noqa: PLR0913
     :param overwrite: If True, drop and recreate the table. Default True
     :param auto_create_table: If True, create the table if it doesn't exist. Default True
     :param use_logical_type: Whether to use Parquet logical types when reading the parquet files. Default True.
+    :param use_vectorized_scanner: Whether to load the Parquet files with Snowflake's vectorized scanner. Default False.
     :return: Complete SQL script with table management and COPY INTO commands
     """
     sql_statements = []
@@ -123,7 +123,7 @@ def _generate_s3_to_snowflake_copy_query(  # noqa: PLR0913
     # columns_str = ",\n  ".join([f"PARSE_JSON($1):{col_name}::{col_type}" for col_name, col_type in table_definition])
 
     copy_query = f"""COPY INTO {table_name} FROM '@{snowflake_stage_path}'
-        FILE_FORMAT = (TYPE = 'parquet' USE_LOGICAL_TYPE = {use_logical_type})
+        FILE_FORMAT = (TYPE = 'parquet' USE_LOGICAL_TYPE = {use_logical_type} USE_VECTORIZED_SCANNER = {use_vectorized_scanner})
         MATCH_BY_COLUMN_NAME = 'CASE_INSENSITIVE'
         ;"""
     sql_statements.append(copy_query)
@@ -152,8 +152,6 @@ def _infer_table_schema(conn, snowflake_stage_path: str, use_logical_type: bool)
         ));
     """
     cursor = _execute_sql(conn, infer_schema_query)
-    if cursor is None:
-        raise ValueError("Failed to infer schema: No cursor returned from Snowflake.")
     result = cursor.fetch_pandas_all()
     return list(zip(result["COLUMN_NAME"], result["TYPE"]))
 
@@ -172,7 +170,7 @@ def _copy_snowflake_to_s3(
 
     :return: List of S3 file paths where the data was exported
     """
-    schema = PROD_SCHEMA if current.is_production else DEV_SCHEMA
+    schema = _get_schema()
 
     if s3_path is None:
         s3_path, sf_stage_path = _generate_s3_stage_paths()
@@ -184,8 +182,8 @@ def _copy_snowflake_to_s3(
         snowflake_stage_path=sf_stage_path,
     )
     conn = get_snowflake_connection(warehouse=warehouse, use_utc=use_utc)
-    _execute_sql(conn, f"USE SCHEMA PATTERN_DB.{schema};")
-    _execute_sql(conn, query)
+    # set the schema in the same request as the export, to save a round-trip
+    _execute_sql(conn, f"USE SCHEMA PATTERN_DB.{schema};\n{query}")
 
     print(f"✅ Data exported to S3 path: {s3_path}")
 
@@ -201,6 +199,7 @@ def _copy_s3_to_snowflake(  # noqa: PLR0913
     auto_create_table: bool = False,
     overwrite: bool = False,
     use_logical_type: bool = True,
+    use_vectorized_scanner: bool = False,
 ):
     """Generate SQL commands to load data from S3 to Snowflake table.
 
@@ -215,10 +214,11 @@ def _copy_s3_to_snowflake(  # noqa: PLR0913
     :param overwrite: If True, drop and recreate the table. Default True
     :param auto_create_table: If True, create the table if it doesn't exist. Default True
     :param use_logical_type: Whether to use Parquet logical types when reading the parquet files. Default True.
+    :param use_vectorized_scanner: Whether to load the Parquet files with Snowflake's vectorized scanner. Default False.
     :return: Complete SQL script with table management and COPY INTO commands
     """
     table_name = table_name.upper()
-    schema = PROD_SCHEMA if current.is_production else DEV_SCHEMA
+    schema = _get_schema()
     snowflake_stage_path = _get_snowflake_stage_path(s3_path)
 
     conn = get_snowflake_connection(warehouse=warehouse, use_utc=use_utc)
@@ -240,6 +240,7 @@ def _copy_s3_to_snowflake(  # noqa: PLR0913
         overwrite=overwrite,
         auto_create_table=auto_create_table,
         use_logical_type=use_logical_type,
+        use_vectorized_scanner=use_vectorized_scanner,
     )
     _execute_sql(conn, copy_query)
 
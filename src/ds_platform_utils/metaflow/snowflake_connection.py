@@ -1,9 +1,12 @@
-import os
-from typing import Literal, Optional, Union
+import atexit
+import threading
+from typing import Dict, Literal, Optional, Tuple, Union
 
 from metaflow import Snowflake, current
 from snowflake.connector import SnowflakeConnection
 
+from ds_platform_utils.metaflow._consts import DEV_SCHEMA, PROD_SCHEMA
+
 ####################
 # --- Metaflow --- #
 ####################
@@ -11,6 +14,11 @@ from snowflake.connector import SnowflakeConnection
 # an integration with this name exists both in the default and prod perimeters
 SNOWFLAKE_INTEGRATION = "snowflake-default"
 
+# open connections, keyed by the (warehouse, use_utc, query_tag) they were created with
+_CONNECTION_CACHE: Dict[Tuple[Optional[str], bool, Optional[str]], SnowflakeConnection] = {}
+# guards creation of new connections, so that threads racing on a cache miss only log in once
+_CONNECTION_LOCK = threading.Lock()
+
 
 def get_snowflake_warehouse(
     warehouse: str,
@@ -25,7 +33,11 @@ def get_snowflake_warehouse(
     return warehouse.upper()
 
 
-# @lru_cache
+def _get_schema() -> str:
+    """Return the schema that the current flow publishes to and queries from."""
+    return PROD_SCHEMA if current.is_production else DEV_SCHEMA
+
+
 def get_snowflake_connection(
     warehouse: Optional[Union[Literal["XS", "MED", "XL"], str]] = None,
     use_utc: bool = True,
@@ -44,27 +56,42 @@ def get_snowflake_connection(
         - other standard metadata are set, e.g. universal, automatically set tags for all queries
 
     2. Outerbounds often fails when creating a snowflake connection due to a mysterious DNS
-       resolution error that they have not fixed. Using @lru_cache makes it so this function
-       always returns the same connection object for a given set of parameters. This allows
-       us to easily re-use the same connection object without having to explicitly pass it into
-       every function, e.g. publish(conn=), publish_pandas(conn=), etc.
-
-    Note: the connection object returned by this function is not manually closed.
-    That is okay. The Snowflake SDK automatically closes any unclosed connection objects
-    when the Python process exists (which the exception of ^C SIGTERM aka manual interrupt signals).
+       resolution error that they have not fixed. Creating a connection is also slow (a full
+       login handshake). So this function caches connections and returns the same open
+       connection object for a given set of parameters. This allows us to easily re-use the
+       same connection object without having to explicitly pass it into every function,
+       e.g. publish(conn=), publish_pandas(conn=), etc. If a cached connection has been closed,
+       a new one is created in its place. Creation is guarded by a lock, so threads that
+       ask for the same connection at once share a single login.
+
+    Note: the connection object returned by this function should not be closed by the caller,
+    since it is shared with later calls. Cached connections are closed when the Python process
+    exits (with the exception of ^C SIGTERM aka manual interrupt signals).
     In metaflow, each step is a separate Python process, so the connection will automatically be
     closed at the end of any steps that use this singleton.
     """
-    if current and hasattr(current, "project_name"):
-        query_tag = current.project_name
-    else:
-        query_tag = None
+    # one lookup on the `current` proxy instead of a hasattr() followed by a second access
+    query_tag: Optional[str] = getattr(current, "project_name", None)
+
+    warehouse_name = get_snowflake_warehouse(warehouse)
+    cache_key = (warehouse_name, use_utc, query_tag)
+
+    conn = _CONNECTION_CACHE.get(cache_key)
+    if conn is not None and not conn.is_closed():
+        return conn
+
+    with _CONNECTION_LOCK:
+        # another thread may have created the connection while we waited for the lock
+        conn = _CONNECTION_CACHE.get(cache_key)
+        if conn is None or conn.is_closed():
+            conn = _create_snowflake_connection(
+                warehouse=warehouse_name,
+                use_utc=use_utc,
+                query_tag=query_tag,
+            )
+            _CONNECTION_CACHE[cache_key] = conn
 
-    return _create_snowflake_connection(
-        warehouse=get_snowflake_warehouse(warehouse),
-        use_utc=use_utc,
-        query_tag=query_tag,
-    )
+    return conn
 
 
 #####################
@@ -73,33 +100,44 @@ def get_snowflake_connection(
 
 
 def _create_snowflake_connection(
-    warehouse: str,
+    warehouse: Optional[str],
     use_utc: bool,
     query_tag: Optional[str] = None,
 ) -> SnowflakeConnection:
+    # session parameters are sent with the login request, so setting them costs no extra round-trips
+    session_parameters = {
+        # fetch_arrow_all() and fetch_pandas_all() only work with Arrow results
+        "PYTHON_CONNECTOR_QUERY_RESULT_FORMAT": "ARROW",
+    }
+    if query_tag is not None:
+        session_parameters["QUERY_TAG"] = query_tag
+
     conn: SnowflakeConnection = Snowflake(
         integration=SNOWFLAKE_INTEGRATION,
         client_session_keep_alive=True,
         timezone="UTC" if use_utc else None,
-        session_parameters={"QUERY_TAG": query_tag},
+        session_parameters=session_parameters,
     ).cn  # type: ignore[attr-defined]
 
     # Doing this in the connection parameters result in silently failing to set the warehouse,
     # so we have to execute a raw query to set it.
     try:
-        conn.execute_string("USE WAREHOUSE {}".format(warehouse))
+        with conn.cursor() as cur:
+            cur.execute("USE WAREHOUSE {}".format(warehouse))
     except Exception as e:
         raise RuntimeError(f"Failed to set Snowflake warehouse to {warehouse}: {e}") from e
 
     return conn
 
 
-def _debug_print_query(query: str) -> None:
-    """Print query if DEBUG_QUERY env var is set.
+def _close_cached_connections() -> None:
+    """Close all cached connections, ending their Snowflake sessions."""
+    for conn in _CONNECTION_CACHE.values():
+        try:
+            conn.close()
+        except Exception:  # best effort; the process is exiting anyway
+            pass
+    _CONNECTION_CACHE.clear()
 
-    :param query: SQL query to print
-    """
-    if os.getenv("DEBUG_QUERY"):
-        print("\n=== DEBUG SQL QUERY ===")
-        print(query)
-        print("=====================\n")
+
+atexit.register(_close_cached_connections)
@@ -8,11 +8,25 @@ else:
     import tomli as tomllib
 
 import json
-from typing import Callable
+import re
+from typing import Any, Callable
 
 import yaml
 from pydantic import BaseModel
 
+# PyYAML's wheels ship with libyaml, whose C loader is much faster than the pure-Python one;
+# fall back to the latter if PyYAML was built without it
+try:
+    from yaml import CSafeLoader as _YamlSafeLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlSafeLoader  # type: ignore[assignment]
+
+# the first line of a config that isn't blank or a comment
+_FIRST_LINE_RE = re.compile(r"^[ \t]*([^\s#].*)$", re.MULTILINE)
+# how every TOML document's first line starts: a [table] header, or a (possibly dotted/quoted) key followed by `=`
+_TOML_KEY = r"""(?:[A-Za-z0-9_-]+|"[^"]*"|'[^']*')"""
+_TOML_FIRST_LINE_RE = re.compile(rf"\[|{_TOML_KEY}(?:\s*\.\s*{_TOML_KEY})*\s*=")
+
 
 def make_pydantic_parser_fn(pydantic_model: type[BaseModel]) -> Callable[[str], dict]:
     '''Return a function that can be passed to as `parser=` for a Metaflow config.
@@ -61,22 +75,7 @@ def make_pydantic_parser_fn(pydantic_model: type[BaseModel]) -> Callable[[str],
     '''
 
     def _parse_config(config_txt: str) -> dict:
-        # Try to parse the config as JSON
-        try:
-            cfg = json.loads(config_txt)
-        except json.JSONDecodeError:
-            # If JSON parsing fails, try to parse as TOML
-            try:
-                cfg = tomllib.loads(config_txt)
-            except tomllib.TOMLDecodeError:
-                # If TOML parsing fails, try to parse as YAML
-                try:
-                    cfg = yaml.safe_load(config_txt)
-                except yaml.YAMLError as e:
-                    raise ValueError(
-                        "Config parsing failed. Ensure it is valid JSON, TOML, or YAML."
-                        "YAML is preferred because it supports comments."
-                    ) from e
+        cfg = _load_config_txt(config_txt)
 
         # instantiate the pydantic model from the dict,
         # then dump back to a dict (so that default values are applied)
@@ -85,3 +84,35 @@ def make_pydantic_parser_fn(pydantic_model: type[BaseModel]) -> Callable[[str],
         return result
 
     return _parse_config
+
+
+def _load_config_txt(config_txt: str) -> Any:
+    """Parse a config written as JSON, TOML, or YAML."""
+    first_line_match = _FIRST_LINE_RE.search(config_txt)
+    first_line = first_line_match.group(1) if first_line_match else ""
+
+    # Try to parse the config as JSON. A JSON config is an object, so skip the attempt
+    # (and the failed parse) for text that can't be one, e.g. a YAML or TOML config.
+    if first_line.startswith(("{", "[")):
+        try:
+            return json.loads(config_txt)
+        except json.JSONDecodeError:
+            pass
+
+    # If JSON parsing fails, try to parse as TOML. Skip the attempt for text that can't be
+    # TOML, which spares (preferred) YAML configs a failed TOML parse. An empty (or comments-only)
+    # config is still parsed as TOML, so that it gives an empty dict.
+    if not first_line or _TOML_FIRST_LINE_RE.match(first_line):
+        try:
+            return tomllib.loads(config_txt)
+        except tomllib.TOMLDecodeError:
+            pass
+
+    # If TOML parsing fails, try to parse as YAML
+    try:
+        return yaml.load(config_txt, Loader=_YamlSafeLoader)
+    except yaml.YAMLError as e:
+        raise ValueError(
+            "Config parsing failed. Ensure it is valid JSON, TOML, or YAML."
+            "YAML is preferred because it supports comments."
+        ) from e
@@ -100,23 +100,25 @@ def update_card_with_operation_info(
     """
     print(operation.operation_type)
 
+    components: List[Union[Markdown, Table]] = []
+
     # Show table preview after write operations
     if last_op_was_write:
-        for element in fetch_table_preview(
-            n_rows=10,
-            database="PATTERN_DB",
-            schema=operation.schema,
-            table_name=operation.table_name,
-            cursor=cursor,
-        ):
-            current.card.append(element)
+        components.extend(
+            fetch_table_preview(
+                n_rows=10,
+                database="PATTERN_DB",
+                schema=operation.schema,
+                table_name=operation.table_name,
+                cursor=cursor,
+            )
+        )
 
     # Add operation content to card
-    content = get_card_content(operation=operation, last_op_was_write=last_op_was_write)
-    for item in content:
-        current.card.append(item)
+    components.extend(get_card_content(operation=operation, last_op_was_write=last_op_was_write))
+    current.card.extend(components)
 
-    # Update card live
+    # Update card live; once per operation, so that progress shows while the next query runs
     current.card.refresh()
 
 
@@ -138,15 +140,12 @@ def get_card_content(operation: "SQLOperation", last_op_was_write: bool) -> list
         Markdown(f"```sql\n{dedent(operation.query)}\n```"),
     ]
 
-    # for writes: show table preview if available
-    if operation.operation_type == "write" and isinstance(operation, AuditSQLOperation) and operation.results:
-        content.append(Markdown("\nTable Preview:"))
-        table_rows = [[col, Artifact(val)] for col, val in operation.results.items()]
-        content.append(Table(table_rows))
-
-    # for audits: show the results
+    # for writes: show table preview if available; for audits: show the results
     if isinstance(operation, AuditSQLOperation) and operation.results:
-        content.append(Markdown("Results:"))
+        if operation.operation_type == "write":
+            content.append(Markdown("\nTable Preview:"))
+        else:
+            content.append(Markdown("Results:"))
         table_rows = [[col, Artifact(val)] for col, val in operation.results.items()]
         content.append(Table(table_rows))
 
@@ -195,8 +194,6 @@ def fetch_table_preview(
             LIMIT {n_rows};
             """,
         )
-        if result_cursor is None:
-            return []
         columns = [col[0] for col in result_cursor.description]
         rows = result_cursor.fetchall()
 
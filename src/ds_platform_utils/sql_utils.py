@@ -2,6 +2,8 @@
 
 import json
 import os
+import re
+from functools import lru_cache
 from pathlib import Path
 from textwrap import dedent
 from typing import Any, Optional, Union
@@ -9,22 +11,59 @@ from typing import Any, Optional, Union
 import sqlparse
 from jinja2 import DebugUndefined, Template
 
+# matches a plain Jinja2 variable placeholder, e.g. "{{schema}}" or "{{ table_name }}"
+_JINJA_VAR_RE = re.compile(r"\{\{\s*([A-Za-z_]\w*)\s*\}\}")
+
+
+def _uses_only_jinja_variables(string: str) -> bool:
+    """Return True if the only Jinja2 syntax in ``string`` is plain ``{{ var }}`` placeholders."""
+    if "{%" in string or "{#" in string:
+        return False
+    return string.count("{{") == len(_JINJA_VAR_RE.findall(string))
+
 
 def substitute_map_into_string(string: str, values: dict[str, Any]) -> str:
-    """Format a string using a dictionary with Jinja2 templating."""
-    template = Template(string, undefined=DebugUndefined)
-    return template.render(values)
+    """Format a string using a dictionary with Jinja2 templating.
+
+    Plain ``{{ var }}`` placeholders are substituted with a precompiled regex, which avoids
+    compiling a Jinja2 template on every call. Placeholders without a value are left intact,
+    like Jinja2's ``DebugUndefined``. Strings using any other Jinja2 syntax (filters, blocks,
+    comments, etc.) are rendered with Jinja2, and the compiled template is cached.
+    """
+    if not _uses_only_jinja_variables(string):
+        return _compile_jinja_template(string).render(values)
+
+    return _JINJA_VAR_RE.sub(lambda m: str(values[m.group(1)]) if m.group(1) in values else m.group(0), string)
+
+
+@lru_cache(maxsize=128)
+def _compile_jinja_template(string: str) -> Template:
+    """Compile ``string`` into a Jinja2 template, caching it since the same queries are rendered repeatedly."""
+    return Template(string, undefined=DebugUndefined)
 
 
 def get_query_from_string_or_fpath(query_str_or_fpath: Union[str, Path]) -> str:
     """Get the SQL query from a string or file path."""
     stripped_query = str(query_str_or_fpath).strip()
-    query_is_file_path = isinstance(query_str_or_fpath, Path) or stripped_query.endswith(".sql")
+    # a multi-line string ending in ".sql" (e.g. a trailing comment) is a query, not a path
+    query_is_file_path = isinstance(query_str_or_fpath, Path) or (
+        stripped_query.endswith(".sql") and "\n" not in stripped_query
+    )
     if query_is_file_path:
-        return Path(query_str_or_fpath).read_text()
+        fpath = Path(query_str_or_fpath)
+        return _read_sql_file(str(fpath.resolve()), fpath.stat().st_mtime_ns)
     return stripped_query
 
 
+@lru_cache(maxsize=256)
+def _read_sql_file(abs_path: str, mtime_ns: int) -> str:
+    """Read a SQL file, caching the contents.
+
+    ``mtime_ns`` is only part of the cache key, so that edits to the file invalidate the cache.
+    """
+    return Path(abs_path).read_text()
+
+
 def get_select_dev_query_tags(current_obj: Optional[Any] = None) -> dict[str, Optional[str]]:
     """Return tags for the current Metaflow flow run for select.dev tracking.
 
@@ -72,15 +111,16 @@ def get_select_dev_query_tags(current_obj: Optional[Any] = None) -> dict[str, Op
     def _attr(name: str, default: str = "unknown") -> str:
         return str(getattr(current_obj, name, default))
 
+    domain = _extract("ds.domain")
     return {
-        "app": _extract("ds.domain"),
+        "app": domain,
         "workload_id": _extract("ds.project"),
         "flow_name": _attr("flow_name"),
         "project": _attr("project_name"),
         "step_name": _attr("step_name"),
         "run_id": _attr("run_id"),
         "user": _attr("username"),
-        "domain": _extract("ds.domain"),
+        "domain": domain,
         "namespace": _attr("namespace"),
         "perimeter": str(os.environ.get("OB_CURRENT_PERIMETER") or os.environ.get("OBP_PERIMETER")),
         "is_production": _attr("is_production", "False"),
@@ -88,6 +128,11 @@ def get_select_dev_query_tags(current_obj: Optional[Any] = None) -> dict[str, Op
     }
 
 
+def split_sql_statements(sql_text: str) -> list[str]:
+    """Split `sql_text` into its individual statements, with comments and blank statements removed."""
+    return [s.strip() for s in sqlparse.split(sqlparse.format(sql_text, strip_comments=True)) if s.strip()]
+
+
 def add_comment_to_each_sql_statement(sql_text: str, comment: str) -> str:
     """Append `comment` (e.g., /* {...} */) to every SQL statement in `sql_text`.
 
@@ -101,7 +146,7 @@ def add_comment_to_each_sql_statement(sql_text: str, comment: str) -> str:
     The comment is inserted immediately before the terminating semicolon of each statement,
     preserving whether the original statement had one.
     """
-    statements = [s.strip() for s in sqlparse.split(sqlparse.format(sql_text, strip_comments=True)) if s.strip()]
+    statements = split_sql_statements(sql_text)
     annotated = []
     for stmt in statements:
         stmt = stmt.rstrip(";").strip()
@@ -62,12 +62,8 @@ class TestRestoreFlowState(FlowSpec):
     @step
     def execute_sql(self):
         """Execute sample SQL query."""
-        import os
-
         from ds_platform_utils.metaflow import publish
 
-        os.environ["DEBUG_QUERY"] = "1"
-
         publish(
             table_name=self.config.table_name,
             query=dedent("""\
@@ -23,7 +23,6 @@ class TestBatchInferencePipeline(FlowSpec):
     @step
     def query_and_batch(self):
         """Run the query and batch step."""
-        os.environ["DEBUG_QUERY"] = "1"
         self.n = 10000000
         query = f"SELECT UNIFORM(0::FLOAT, 10::FLOAT, RANDOM()) F1 , UNIFORM(0::INT, 1000::INT, RANDOM()) F2 FROM TABLE(GENERATOR(ROWCOUNT => {self.n}));"
         self.pipeline = BatchInferencePipeline()
@@ -51,8 +50,6 @@ class TestBatchInferencePipeline(FlowSpec):
     @step
     def publish_results(self, inputs):
         """Join the parallel branches."""
-        os.environ["DEBUG_QUERY"] = "1"
-
         print("Joining results from all workers...")
         inputs[0].pipeline.publish_results(
             output_table_name="DS_PLATFORM_UTILS_TEST_BATCH_INFERENCE_OUTPUT",
@@ -90,15 +87,19 @@ def test_warehouse_flow():
         "--tag=ds.project:ds-platform-utils-tests",
     ]
 
+    # DEBUG_QUERY is read when ds_platform_utils is imported, so it must be set before the flow starts
+    env = {**os.environ, "DEBUG_QUERY": "1"}
+
     print("\n=== Metaflow Output ===")
-    for line in execute_with_output(cmd):
+    for line in execute_with_output(cmd, env=env):
         print(line, end="")
 
 
-def execute_with_output(cmd):
+def execute_with_output(cmd, env=None):
     """Execute a command and yield output lines as they are produced."""
     process = subprocess.Popen(
         cmd,
+        env=env,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,  # Merge stderr into stdout
         universal_newlines=True,
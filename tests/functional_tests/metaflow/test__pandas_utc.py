@@ -19,14 +19,13 @@ class TestPandasReadWriteUTCFlow(FlowSpec):
     @step
     def test_publish_pandas_with_use_utc(self):
         """Test publishing a DataFrame with a UTC datetime column."""
-        from datetime import datetime, timedelta
+        from datetime import datetime, timedelta, timezone
 
         import pandas as pd
-        import pytz
 
         from ds_platform_utils.metaflow import publish_pandas
 
-        now_utc = datetime.now(pytz.UTC)
+        now_utc = datetime.now(timezone.utc)
         data = {
             "id": [1, 2, 3, 4, 5],
             "name": ["Mario", "Luigi", "Peach", "Bowser", "Toad"],
@@ -83,16 +82,16 @@ class TestPandasReadWriteUTCFlow(FlowSpec):
     def test_publish_pandas_with_use_utc_false(self):
         """Publish pandas DataFrame with use_utc=False and IST or MST timezone."""
         from datetime import datetime, timedelta
+        from zoneinfo import ZoneInfo
 
         import pandas as pd
-        import pytz
 
         from ds_platform_utils.metaflow import publish_pandas
 
         # Choose IST or MST timezone
         # IST: Asia/Kolkata, MST: US/Mountain
-        tz = pytz.timezone("Asia/Kolkata")  # For IST
-        # tz = pytz.timezone("US/Mountain")  # For MST
+        tz = ZoneInfo("Asia/Kolkata")  # For IST
+        # tz = ZoneInfo("US/Mountain")  # For MST
 
         now_tz = datetime.now(tz)
         data = {
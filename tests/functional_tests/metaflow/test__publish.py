@@ -1,5 +1,6 @@
 """A Metaflow flow."""
 
+import os
 import subprocess
 import sys
 from pathlib import Path
@@ -30,12 +31,8 @@ class TestPublishFlow(FlowSpec):
     @step
     def start(self):
         """Execute sample SQL query."""
-        import os
-
         from ds_platform_utils.metaflow import publish
 
-        os.environ["DEBUG_QUERY"] = "1"
-
         query = """
         -- Create a test table
         CREATE OR REPLACE TABLE PATTERN_DB.{{schema}}.{{table_name}} (
@@ -122,15 +119,19 @@ def test_publish_flow():
         "--tag=ds.project:ds-platform-utils-tests",
     ]
 
+    # DEBUG_QUERY is read when ds_platform_utils is imported, so it must be set before the flow starts
+    env = {**os.environ, "DEBUG_QUERY": "1"}
+
     print("\n=== Metaflow Output ===")
-    for line in execute_with_output(cmd):
+    for line in execute_with_output(cmd, env=env):
         print(line, end="")
 
 
-def execute_with_output(cmd):
+def execute_with_output(cmd, env=None):
     """Execute a command and yield output lines as they are produced."""
     process = subprocess.Popen(
         cmd,
+        env=env,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,  # Merge stderr into stdout
         universal_newlines=True,
@@ -0,0 +1,34 @@
+from collections import OrderedDict
+
+from ds_platform_utils.metaflow.dotdict import DotDict, convert_to_dotdict
+
+
+def test_convert_to_dotdict_nested():
+    """Test that nested string-keyed mappings, including those inside lists and tuples, become DotDicts."""
+    config = {"model": {"layers": [{"units": 8}, ({"units": 4},)]}}
+
+    converted = convert_to_dotdict(config)
+
+    assert isinstance(converted, DotDict)
+    assert converted.model.layers[0].units == 8
+    assert isinstance(converted.model.layers[1], tuple)
+    assert converted.model.layers[1][0].units == 4
+
+
+def test_convert_to_dotdict_keeps_mappings_with_non_string_keys():
+    """Test that mappings with non-string keys keep their type, while their values are still converted."""
+    config = OrderedDict([("a", 1), (2, {"b": 3})])
+
+    converted = convert_to_dotdict(config)
+
+    assert type(converted) is OrderedDict
+    assert list(converted) == ["a", 2]
+    assert converted[2].b == 3
+
+
+def test_dotdict_getattr_missing_key():
+    """Test that accessing a missing key as an attribute raises AttributeError."""
+    dot_dict = DotDict(a=1)
+
+    assert dot_dict.a == 1
+    assert not hasattr(dot_dict, "b")
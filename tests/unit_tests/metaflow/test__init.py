@@ -0,0 +1,11 @@
+import importlib
+import inspect
+
+
+def test_restore_step_state_export_is_the_function():
+    """Test that importing the restore_step_state submodule doesn't shadow the function exported by the package."""
+    importlib.import_module("ds_platform_utils.metaflow.restore_step_state")
+
+    from ds_platform_utils.metaflow import restore_step_state
+
+    assert inspect.isfunction(restore_step_state)
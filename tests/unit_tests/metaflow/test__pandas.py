@@ -0,0 +1,24 @@
+import warnings
+from unittest.mock import MagicMock
+
+import pandas as pd
+import pyarrow as pa
+
+from ds_platform_utils.metaflow import pandas as metaflow_pandas
+
+
+def test_query_pandas_from_snowflake_wide_result_is_not_fragmented(monkeypatch):
+    """Test that a wide query result is returned as a consolidated DataFrame, not one block per column."""
+    n_columns = 120
+    table = pa.table({f"col_{i}": [1, 2, 3] for i in range(n_columns)})
+    monkeypatch.setattr(metaflow_pandas, "current", MagicMock(card=None))
+    monkeypatch.setattr(metaflow_pandas, "_get_schema", lambda: "my_schema")
+    monkeypatch.setattr(metaflow_pandas, "_fetch_arrow_from_snowflake", lambda *args, **kwargs: table)
+
+    df = metaflow_pandas.query_pandas_from_snowflake("SELECT * FROM {schema}.wide_table")
+
+    assert df.shape == (3, n_columns)
+    # pandas warns about inserting into a DataFrame that has more than 100 blocks
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", pd.errors.PerformanceWarning)
+        df["new"] = 1
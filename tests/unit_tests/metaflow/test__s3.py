@@ -0,0 +1,28 @@
+from unittest.mock import MagicMock
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from ds_platform_utils.metaflow import s3
+
+
+def test_put_df_to_s3_folder_writes_chunks_with_one_schema(monkeypatch, tmp_path):
+    """Test that every Parquet part gets the same schema, even when a column is only null in the first chunk."""
+    df = pd.DataFrame({"name": [None, None, "a", "b", "c"], "value": [1, 2, 3, 4, 5]})
+    parts = {}
+
+    def put_files(key_paths):
+        # read the parts before the temporary directory is cleaned up
+        parts.update({key: pq.read_table(local_path) for key, local_path in key_paths})
+
+    s3_client = MagicMock()
+    s3_client.__enter__.return_value.put_files.side_effect = put_files
+    monkeypatch.setattr(s3, "current", MagicMock(tempdir=str(tmp_path)))
+    monkeypatch.setattr(s3, "_get_metaflow_s3_client", lambda: s3_client)
+
+    s3._put_df_to_s3_folder(df, path="s3://bucket/folder/", chunk_size=2)
+
+    assert sorted(parts) == [f"s3://bucket/folder/data_part_{i}.parquet" for i in range(3)]
+    schemas = [table.schema for table in parts.values()]
+    assert all(schema.equals(schemas[0]) for schema in schemas)
+    assert pd.concat([parts[key].to_pandas() for key in sorted(parts)], ignore_index=True).equals(df)
@@ -0,0 +1,55 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+
+from ds_platform_utils.metaflow import snowflake_connection
+from ds_platform_utils.metaflow.snowflake_connection import get_snowflake_connection
+
+
+@pytest.fixture
+def create_connection(monkeypatch):
+    """Replace connection creation with a mock, and start each test with an empty connection cache."""
+    create = MagicMock(side_effect=lambda **_: MagicMock(**{"is_closed.return_value": False}))
+    monkeypatch.setattr(snowflake_connection, "_create_snowflake_connection", create)
+    monkeypatch.setattr(snowflake_connection, "_CONNECTION_CACHE", {})
+    return create
+
+
+def test_get_snowflake_connection_reuses_open_connection(create_connection):
+    """Test that repeated calls with the same parameters share one connection."""
+    conn = get_snowflake_connection(warehouse="MY_WH", use_utc=True)
+
+    assert get_snowflake_connection(warehouse="my_wh", use_utc=True) is conn
+    assert get_snowflake_connection(warehouse="MY_WH", use_utc=False) is not conn
+    assert create_connection.call_count == 2
+
+
+def test_get_snowflake_connection_replaces_closed_connection(create_connection):
+    """Test that a cached connection which has been closed is replaced by a new one."""
+    conn = get_snowflake_connection(warehouse="MY_WH")
+    conn.is_closed.return_value = True
+
+    new_conn = get_snowflake_connection(warehouse="MY_WH")
+
+    assert new_conn is not conn
+    assert get_snowflake_connection(warehouse="MY_WH") is new_conn
+    assert create_connection.call_count == 2
+
+
+def test_get_snowflake_connection_creates_one_connection_for_concurrent_misses(create_connection):
+    """Test that threads missing the cache at the same time share a single new connection."""
+
+    def slow_create(**_):
+        # give the other threads time to miss the cache while this connection is being created
+        time.sleep(0.1)
+        return MagicMock(**{"is_closed.return_value": False})
+
+    create_connection.side_effect = slow_create
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        conns = list(executor.map(lambda _: get_snowflake_connection(warehouse="MY_WH"), range(8)))
+
+    assert create_connection.call_count == 1
+    assert all(conn is conns[0] for conn in conns)
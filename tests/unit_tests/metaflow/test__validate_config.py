@@ -53,6 +53,34 @@ def test_valid_toml():
     assert config["optional_field"] == "custom_toml"
 
 
+def test_valid_yaml_flow_mapping():
+    """Test that YAML which starts like JSON, but isn't, still falls through to the YAML parser."""
+    parser = make_pydantic_parser_fn(TestConfig)
+    config = parser("{name: test_flow_yaml, value: 7}")
+    assert config["name"] == "test_flow_yaml"
+    assert config["value"] == 7
+
+
+def test_valid_toml_with_leading_comment_and_table():
+    """Test that TOML is recognized after comments, and with tables and quoted keys."""
+
+    class NestedConfig(BaseModel):
+        name: str
+        model: dict[str, int]
+
+    parser = make_pydantic_parser_fn(NestedConfig)
+    toml_str = textwrap.dedent("""
+        # a comment
+        "name" = "test_toml"
+
+        [model]
+        layers = 3
+    """)
+    config = parser(toml_str)
+    assert config["name"] == "test_toml"
+    assert config["model"] == {"layers": 3}
+
+
 def test_invalid_json():
     parser = make_pydantic_parser_fn(TestConfig)
     with pytest.raises(ValueError):
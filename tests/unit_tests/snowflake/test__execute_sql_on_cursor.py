@@ -0,0 +1,28 @@
+from unittest.mock import MagicMock
+
+from ds_platform_utils._snowflake.run_query import _execute_sql_on_cursor
+
+
+def test_execute_sql_on_cursor_submits_batch_in_one_request():
+    """Test that a batch is submitted with the multi-statement API on the given cursor."""
+    cursor = MagicMock(**{"nextset.side_effect": [True, None]})
+
+    result = _execute_sql_on_cursor(cursor, "CREATE TABLE t (id INT); SELECT * FROM t;")
+
+    assert result is cursor
+    cursor.execute.assert_called_once()
+    assert cursor.execute.call_args.kwargs == {"num_statements": 0}
+    cursor.connection.execute_string.assert_not_called()
+
+
+def test_execute_sql_on_cursor_runs_put_with_execute_string():
+    """Test that a batch with a PUT statement, which Snowflake rejects in multi-statement requests, is split."""
+    put_cursor, select_cursor = MagicMock(), MagicMock()
+    cursor = MagicMock()
+    cursor.connection.execute_string.return_value = [put_cursor, select_cursor]
+
+    result = _execute_sql_on_cursor(cursor, "put file:///tmp/data.csv @my_stage;\nSELECT 1;")
+
+    assert result is select_cursor
+    cursor.execute.assert_not_called()
+    cursor.connection.execute_string.assert_called_once()
@@ -0,0 +1,30 @@
+import os
+
+from ds_platform_utils.sql_utils import get_query_from_string_or_fpath
+
+
+def test_get_query_from_string():
+    """Test that a query string is returned stripped."""
+    assert get_query_from_string_or_fpath("  select 1;\n") == "select 1;"
+
+
+def test_get_query_from_fpath_picks_up_edits(tmp_path):
+    """Test that cached file reads are invalidated when the file changes."""
+    fpath = tmp_path / "query.sql"
+    fpath.write_text("select 1;")
+    assert get_query_from_string_or_fpath(fpath) == "select 1;"
+    assert get_query_from_string_or_fpath(str(fpath)) == "select 1;"
+
+    fpath.write_text("select 2;")
+    # bump the mtime explicitly in case the filesystem's mtime resolution is coarse
+    stat = fpath.stat()
+    os.utime(fpath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert get_query_from_string_or_fpath(fpath) == "select 2;"
+
+
+def test_get_query_from_multiline_string_ending_in_sql():
+    """Test that a query ending in ".sql" is not mistaken for a file path."""
+    query = "select *\nfrom foo -- see queries/foo.sql"
+
+    assert get_query_from_string_or_fpath(query) == query
@@ -0,0 +1,28 @@
+from ds_platform_utils.sql_utils import substitute_map_into_string
+
+
+def test_substitute_map_into_string():
+    """Test substituting values into plain placeholders, with and without whitespace."""
+    query = "select * from PATTERN_DB.{{schema}}.{{ table_name }} where region = '{{region}}'"
+
+    output = substitute_map_into_string(query, {"schema": "DATA_SCIENCE", "table_name": "foo", "region": "US"})
+
+    assert output == "select * from PATTERN_DB.DATA_SCIENCE.foo where region = 'US'"
+
+
+def test_substitute_map_into_string_leaves_unknown_placeholders():
+    """Test that placeholders without a value are left intact."""
+    query = "select * from PATTERN_DB.{{schema}}.{{table_name}}"
+
+    output = substitute_map_into_string(query, {"schema": "DATA_SCIENCE"})
+
+    assert output == "select * from PATTERN_DB.DATA_SCIENCE.{{table_name}}"
+
+
+def test_substitute_map_into_string_falls_back_to_jinja():
+    """Test that templates using other Jinja2 syntax are still rendered with Jinja2."""
+    query = "select {% for col in cols %}{{ col | upper }}{% if not loop.last %}, {% endif %}{% endfor %} from foo"
+
+    output = substitute_map_into_string(query, {"cols": ["a", "b"]})
+
+    assert output == "select A, B from foo"
@@ -1,6 +1,10 @@
+from unittest.mock import MagicMock
+
 import pytest
 
 from ds_platform_utils._snowflake.write_audit_publish import (
+    audit,
+    query_contains_parameterized_schema_and_table_name,
     substitute_map_into_string,
     write_audit_publish,
 )
@@ -104,7 +108,7 @@ def test__write_audit_publish__invalid_audit():
         "SELECT COUNT(*) FROM wrong_table"  # Missing {{schema}}.{{table_name}}
     ]
 
-    with pytest.raises(ValueError, match="must use the literal string"):
+    with pytest.raises(ValueError, match=r"index 0 must use the literal string '\{\{ schema \}\}"):
         list(write_audit_publish(table_name=table_name, query=query, audits=audits, cursor=None))
 
 
@@ -166,3 +170,114 @@ def test_write_audit_publish_with_ctx():
     # Verify context was substituted in audit operation
     assert "date = '2024-01-01'" in operations[2].query
     assert "region = 'US'" in operations[2].query
+
+
+def test_write_audit_publish_publish_drops_branch_table():
+    """Test that the publish operation drops the branch table in the same batch as the swap."""
+    table_name = "test_table"
+    query = """
+    CREATE TABLE PATTERN_DB.{{schema}}.{{table_name}} AS
+    SELECT * FROM source_table;
+    """
+    audits = [
+        "SELECT COUNT(*) > 0 as has_rows FROM PATTERN_DB.{{schema}}.{{table_name}}",
+    ]
+
+    operations = list(
+        write_audit_publish(
+            table_name=table_name, query=query, audits=audits, is_test=True, cursor=None, branch_name="abc"
+        )
+    )
+
+    publish_op = operations[-1]
+    assert publish_op.operation_type == "publish"
+    assert "SWAP WITH PATTERN_DB.DATA_SCIENCE_STAGE.test_table_abc_test" in publish_op.query
+    assert "DROP TABLE IF EXISTS PATTERN_DB.DATA_SCIENCE_STAGE.test_table_abc_test" in publish_op.query
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "select * from PATTERN_DB.{{schema}}.{{table_name}}",
+        "select * from PATTERN_DB.{{ schema }}.{{ table_name }}",
+        "select * from PATTERN_DB.{{schema }}.{{  table_name}}",
+    ],
+)
+def test_query_contains_parameterized_schema_and_table_name(query):
+    """Test that whitespace variants of the schema/table placeholders are accepted."""
+    assert query_contains_parameterized_schema_and_table_name(query)
+
+
+def test_query_contains_parameterized_schema_and_table_name_missing():
+    """Test that queries without the schema/table placeholders are rejected."""
+    assert not query_contains_parameterized_schema_and_table_name("select * from PATTERN_DB.{{schema}}.foo")
+
+
+def test_audit_batches_audits_into_one_request():
+    """Test that single-statement audits are submitted to Snowflake in a single request."""
+    cursor = MagicMock()
+    cursor.nextset.side_effect = [cursor, None]
+    cursor.fetchone.side_effect = [(True,), (False,)]
+    cursor.description = [("passed",)]
+    audits = [
+        "SELECT COUNT(*) > 0 as passed FROM PATTERN_DB.{{schema}}.{{table_name}};",
+        "SELECT COUNT(*) > 1 as passed FROM PATTERN_DB.{{schema}}.{{table_name}}",
+    ]
+
+    operations = audit(table_name="test_table", schema="DATA_SCIENCE_STAGE", audits=audits, cursor=cursor)
+
+    with pytest.raises(AssertionError, match="Audit #2 failed assertions: passed"):
+        for op in operations:
+            assert op.operation_type == "audit"
+
+    assert cursor.execute.call_count == 1
+
+
+def test_write_audit_publish_commits_once():
+    """Test that the whole write-audit-publish flow is committed once, not after every statement."""
+    cursor = MagicMock()
+    cursor.nextset.return_value = None
+    cursor.fetchone.return_value = (True,)
+    cursor.description = [("passed",)]
+
+    operations = write_audit_publish(
+        table_name="test_table",
+        query="CREATE TABLE PATTERN_DB.{{schema}}.{{table_name}} AS SELECT 1 as id",
+        audits=["SELECT COUNT(*) > 0 as passed FROM PATTERN_DB.{{schema}}.{{table_name}}"],
+        cursor=cursor,
+    )
+    for _ in operations:
+        cursor.connection.commit.assert_not_called()
+
+    cursor.connection.commit.assert_called_once()
+
+
+def test_audit_with_no_audits_makes_no_request():
+    """Test that auditing with an empty list of audits doesn't submit an empty batch."""
+    cursor = MagicMock()
+
+    operations = list(audit(table_name="test_table", schema="DATA_SCIENCE_STAGE", audits=[], cursor=cursor))
+
+    assert operations == []
+    cursor.execute.assert_not_called()
+
+
+def test_audit_runs_unbatched_audits_concurrently_on_separate_cursors():
+    """Test that audits that aren't batched each run on their own cursor, with results in order."""
+    cursor = MagicMock()
+    audit_cursor = cursor.connection.cursor.return_value.__enter__.return_value
+    audit_cursor.nextset.return_value = None
+    audit_cursor.fetchone.return_value = (True,)
+    audit_cursor.description = (("passed",),)
+    audits = [
+        "SELECT COUNT(*) > 0 as passed FROM PATTERN_DB.{{schema}}.{{table_name}}",
+        "SELECT COUNT(*) > 1 as passed FROM PATTERN_DB.{{schema}}.{{table_name}}",
+    ]
+
+    operations = list(
+        audit(table_name="test_table", schema="DATA_SCIENCE_STAGE", audits=audits, cursor=cursor, batch_audits=False)
+    )
+
+    assert [op.results for op in operations] == [{"passed": True}, {"passed": True}]
+    assert cursor.connection.cursor.call_count == 2
+    cursor.execute.assert_not_called()